@@ -1,78 +1,968 @@
+import argparse
+import functools
+import time
+from collections.abc import Callable
+
 import matplotlib.pyplot as plt
 import numpy as np
+import scipy.fft
+import scipy.linalg
 from matplotlib.animation import FuncAnimation
 from numpy import ndarray
+from numpy.typing import ArrayLike
 
 # Constants
 N_POINTS: int = 128
 N_ITERATIONS: int = 300  # Increase the number of iterations for more steps
-N_PRESSURE_POISSON_ITERATIONS: int = 50
-TIME_STEP: float = 0.000003  # Smaller time step length for stability
+N_PRESSURE_POISSON_ITERATIONS: int = 2000  # Upper bound on sweeps per solve
+PRESSURE_SOLVER: str = "spectral"  # "spectral" (direct), "jacobi" or "sor"
+PRESSURE_TOLERANCE: float = 1e-4  # Relative residual for the iterative solvers
+ENGINE: str = "primitive"  # "primitive" (u, v, p), "primitive-imex" or "vorticity"
+TIME_INTEGRATION: str = "explicit"  # "explicit" Euler or "imex" (AB2 + ADI diffusion)
+TIME_STEP: float = 0.000003  # Fixed step, used when ADAPTIVE_TIME_STEP is off
+ADAPTIVE_TIME_STEP: bool = True
+SAFETY_FACTOR: float = 0.5  # Fraction of the advective/diffusive stability limit
+MIN_TIME_STEP: float = 1e-7
+MAX_TIME_STEP: float = 1e-2
+END_TIME: float | None = None  # Physical end time; None runs N_ITERATIONS frames
+STEPS_PER_FRAME: int = 50
 KINEMATIC_VISCOSITY: float = 0.1
 HORIZONTAL_VELOCITY: float = 1.0
-EPSILON: float = 1e-6  # Small value to avoid zero range for contour levels
+EPSILON: float = 1e-6  # Small value to avoid zero range for colour limits
+RENDER_BUDGET: float = 0.1  # Largest fraction of wall-clock time spent drawing
+MAX_FRAME_SKIP: int = 50  # Upper bound on simulated batches per drawn frame
+RENDER_SMOOTHING: float = 0.3  # EMA weight of the latest render/solve timings
+COLOUR_LIMIT_SMOOTHING: float = 0.2  # EMA weight of the latest field min/max
+COLORBAR_REFRESH_TOLERANCE: float = 0.05  # Relative drift that redraws colorbars
 DENSITY: float = 1.0
+STEADY_STATE_TOLERANCE: float = 1e-4  # max |du/dt| below which the flow is steady
+STEADY_STATE_CHECK_INTERVAL: int = 10  # Steps between steady-state checks
+MAX_STEADY_STATE_TIME: float = 200.0  # Give up after this much physical time
+ENSEMBLE_BENCHMARK_STEPS: int = 200
+
+# Ghia, Ghia & Shin (1982), J. Comput. Phys. 48, 387-411, Tables I and II:
+# u along the vertical and v along the horizontal centreline of the cavity
+# fmt: off
+GHIA_Y = np.array(
+    [1.0000, 0.9766, 0.9688, 0.9609, 0.9531, 0.8516, 0.7344, 0.6172, 0.5000,
+     0.4531, 0.2813, 0.1719, 0.1016, 0.0703, 0.0625, 0.0547, 0.0000]
+)
+GHIA_U = {
+    100: [1.00000, 0.84123, 0.78871, 0.73722, 0.68717, 0.23151, 0.00332, -0.13641,
+          -0.20581, -0.21090, -0.15662, -0.10150, -0.06434, -0.04775, -0.04192,
+          -0.03717, 0.00000],
+    400: [1.00000, 0.75837, 0.68439, 0.61756, 0.55892, 0.29093, 0.16256, 0.02135,
+          -0.11477, -0.17119, -0.32726, -0.24299, -0.14612, -0.10338, -0.09266,
+          -0.08186, 0.00000],
+    1000: [1.00000, 0.65928, 0.57492, 0.51117, 0.46604, 0.33304, 0.18719, 0.05702,
+           -0.06080, -0.10648, -0.27805, -0.38289, -0.29730, -0.22220, -0.20196,
+           -0.18109, 0.00000],
+}
+GHIA_X = np.array(
+    [1.0000, 0.9688, 0.9609, 0.9531, 0.9453, 0.9063, 0.8594, 0.8047, 0.5000,
+     0.2344, 0.2266, 0.1563, 0.0938, 0.0781, 0.0703, 0.0625, 0.0000]
+)
+GHIA_V = {
+    100: [0.00000, -0.05906, -0.07391, -0.08864, -0.10313, -0.16914, -0.22445,
+          -0.24533, 0.05454, 0.17527, 0.17507, 0.16077, 0.12317, 0.10890, 0.10091,
+          0.09233, 0.00000],
+    400: [0.00000, -0.12146, -0.15663, -0.19254, -0.22847, -0.23827, -0.44993,
+          -0.38598, 0.05186, 0.30174, 0.30203, 0.28124, 0.22965, 0.20920, 0.19713,
+          0.18360, 0.00000],
+    1000: [0.00000, -0.21388, -0.27669, -0.33714, -0.39188, -0.51550, -0.42665,
+           -0.31966, 0.02526, 0.32235, 0.33075, 0.37095, 0.32627, 0.30353, 0.29012,
+           0.27485, 0.00000],
+}
+# fmt: on
 
 
 # Functions
-def central_difference_x(f: ndarray, element_length: float) -> ndarray:
-    diff = np.zeros_like(f)
-    diff[:, 1:-1] = (f[:, 2:] - f[:, :-2]) / (2 * element_length)
-    return diff
+# The stencils leave the boundary entries of `out` untouched, so a reused
+# workspace must start from zeros (np.zeros_like) like the freshly allocated one.
+# Fields may carry leading batch axes; the grid is always the last two axes.
+def central_difference_x(
+    f: ndarray, element_length: float, out: ndarray | None = None
+) -> ndarray:
+    if out is None:
+        out = np.zeros_like(f)
+    interior = out[..., :, 1:-1]
+    np.subtract(f[..., :, 2:], f[..., :, :-2], out=interior)
+    interior *= 0.5 / element_length
+    return out
 
 
-def central_difference_y(f: ndarray, element_length: float) -> ndarray:
-    diff = np.zeros_like(f)
-    diff[1:-1, :] = (f[2:, :] - f[:-2, :]) / (2 * element_length)
-    return diff
+def central_difference_y(
+    f: ndarray, element_length: float, out: ndarray | None = None
+) -> ndarray:
+    if out is None:
+        out = np.zeros_like(f)
+    interior = out[..., 1:-1, :]
+    np.subtract(f[..., 2:, :], f[..., :-2, :], out=interior)
+    interior *= 0.5 / element_length
+    return out
 
 
-def laplace(f: ndarray, element_length: float) -> ndarray:
-    lap = np.zeros_like(f)
-    lap[1:-1, 1:-1] = (
-        f[1:-1, :-2] + f[:-2, 1:-1] + f[1:-1, 2:] + f[2:, 1:-1] - 4 * f[1:-1, 1:-1]
-    ) / (element_length**2)
-    return lap
+def laplace(f: ndarray, element_length: float, out: ndarray | None = None) -> ndarray:
+    if out is None:
+        out = np.zeros_like(f)
+    interior = out[..., 1:-1, 1:-1]
+    np.multiply(f[..., 1:-1, 1:-1], -4.0, out=interior)
+    interior += f[..., 1:-1, :-2]
+    interior += f[..., :-2, 1:-1]
+    interior += f[..., 1:-1, 2:]
+    interior += f[..., 2:, 1:-1]
+    interior *= 1.0 / element_length**2
+    return out
 
 
 def apply_boundary_conditions(
-    u: ndarray, v: ndarray, horizontal_velocity_top: float
+    u: ndarray, v: ndarray, horizontal_velocity_top: float | ndarray
 ) -> tuple[ndarray, ndarray]:
-    u[0, :], u[:, 0], u[:, -1], u[-1, :] = 0.0, 0.0, 0.0, horizontal_velocity_top
-    v[0, :], v[:, 0], v[:, -1], v[-1, :] = 0.0, 0.0, 0.0, 0.0
+    # For batched fields horizontal_velocity_top has shape (B, 1), one per member
+    u[..., 0, :], u[..., :, 0], u[..., :, -1] = 0.0, 0.0, 0.0
+    u[..., -1, :] = horizontal_velocity_top
+    v[..., 0, :], v[..., :, 0], v[..., :, -1], v[..., -1, :] = 0.0, 0.0, 0.0, 0.0
     return u, v
 
 
-def solve_pressure_poisson(p: ndarray, rhs: ndarray, element_length: float) -> ndarray:
-    for _ in range(N_PRESSURE_POISSON_ITERATIONS):
-        p_next = np.copy(p)
-        p_next[1:-1, 1:-1] = 0.25 * (
-            p[1:-1, :-2]
-            + p[:-2, 1:-1]
-            + p[1:-1, 2:]
-            + p[2:, 1:-1]
-            - element_length**2 * rhs[1:-1, 1:-1]
-        )
-        p_next[:, -1] = p_next[:, -2]
-        p_next[0, :] = p_next[1, :]
-        p_next[:, 0] = p_next[1, :]
-        p_next[-1, :] = 0.0
-        p = p_next
+def apply_pressure_boundary_conditions(p: ndarray) -> ndarray:
+    # Zero-gradient walls on the left, right and bottom; p = 0 along the lid
+    p[..., :, -1] = p[..., :, -2]
+    p[..., 0, :] = p[..., 1, :]
+    p[..., :, 0] = p[..., :, 1]
+    p[..., -1, :] = 0.0
     return p
 
 
+def stable_time_step(
+    max_speed: float | ndarray,
+    element_length: float,
+    kinematic_viscosity: float | ndarray,
+    safety_factor: float = SAFETY_FACTOR,
+    min_time_step: float = MIN_TIME_STEP,
+    max_time_step: float = MAX_TIME_STEP,
+    implicit_diffusion: bool = False,
+) -> float:
+    """Largest explicit Euler step allowed for a given peak speed |u| + |v|.
+
+    Combines the advective CFL limit h / max_speed, the limit
+    2 nu / max_speed^2 that central-differenced advection needs under forward
+    Euler, and the diffusive limit h^2 / (4 nu), scales the smallest by
+    `safety_factor` and clamps the result to [min_time_step, max_time_step].
+    With `implicit_diffusion` only the advective CFL limit applies.
+    `max_speed` and `kinematic_viscosity` may be per-member arrays of an
+    ensemble, in which case the step suits the most restrictive member.
+    """
+    h = element_length
+    max_speed = np.asarray(max_speed, dtype=float)
+    nu = np.asarray(kinematic_viscosity, dtype=float)
+    with np.errstate(divide="ignore"):
+        limit = h / max_speed
+        if not implicit_diffusion:
+            limit = np.minimum(limit, h**2 / (4.0 * nu))
+            limit = np.minimum(limit, 2.0 * nu / max_speed**2)
+    return min(max(safety_factor * float(np.min(limit)), min_time_step), max_time_step)
+
+
+def ensemble_parameters(
+    kinematic_viscosity: float | ArrayLike, horizontal_velocity: float | ArrayLike
+) -> tuple[tuple[int, ...], ndarray, ndarray]:
+    """Broadcast per-member viscosities and lid speeds to one batch shape.
+
+    Returns the batch shape (empty for a single run), nu shaped to broadcast
+    against (*batch, N, N) fields and the lid speed shaped (*batch, 1) to
+    broadcast along the lid row.
+    """
+    nu = np.asarray(kinematic_viscosity, dtype=float)
+    lid = np.asarray(horizontal_velocity, dtype=float)
+    batch_shape = np.broadcast_shapes(nu.shape, lid.shape)
+    nu = np.broadcast_to(nu, batch_shape)[..., np.newaxis, np.newaxis]
+    lid = np.broadcast_to(lid, batch_shape)[..., np.newaxis]
+    return batch_shape, nu, lid
+
+
+class IterativePoissonSolver:
+    """Residual-controlled Jacobi or red-black SOR pressure Poisson solver.
+
+    Sweeps start from whatever is already stored in `p`, which the cavity
+    solver keeps from the previous time step, and stop once the relative
+    residual ||rhs - laplace(p)|| / ||rhs|| drops below `tolerance` or after
+    `max_iterations` sweeps. The stopping test needs no extra pass: each
+    point's correction is relaxation * h^2 / 4 times its residual before the
+    update. For red-black SOR the second colour already sees the first
+    colour's new values, so this is an estimate rather than the residual of
+    any single iterate; one extra pass after the loop stores the true relative
+    residual of the returned pressure in `residual`. Red-black ordering
+    updates every point of one colour with strided slices, so SOR stays
+    vectorised. The sweep count of the last solve is kept in `iterations`.
+    With a `batch_shape` every member of an ensemble is swept together until
+    the slowest one has converged.
+    """
+
+    def __init__(
+        self,
+        n_points: int,
+        element_length: float,
+        method: str = "sor",
+        tolerance: float = PRESSURE_TOLERANCE,
+        max_iterations: int = N_PRESSURE_POISSON_ITERATIONS,
+        relaxation: float | None = None,
+        batch_shape: tuple[int, ...] = (),
+    ) -> None:
+        if method == "jacobi":
+            self.stride = 1
+            self.colours = [[(1, 1)]]
+            default_relaxation = 1.0
+        elif method == "sor":
+            self.stride = 2
+            self.colours = [[(1, 1), (2, 2)], [(1, 2), (2, 1)]]
+            default_relaxation = 2.0 / (1.0 + np.sin(np.pi * element_length))
+        else:
+            raise ValueError(f"Unknown iterative pressure solver: {method}")
+
+        self.element_length = element_length
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self.relaxation = default_relaxation if relaxation is None else relaxation
+        self.scaled_rhs = np.zeros((*batch_shape, n_points - 2, n_points - 2))
+        self.scaled_residual = np.zeros_like(self.scaled_rhs)
+        self.updates = {
+            (i0, j0): np.zeros(
+                (
+                    *batch_shape,
+                    len(range(i0, n_points - 1, self.stride)),
+                    len(range(j0, n_points - 1, self.stride)),
+                )
+            )
+            for colour in self.colours
+            for i0, j0 in colour
+        }
+        self.iterations = 0
+        self.residual = 0.0
+
+    def _relax(self, p: ndarray, i0: int, j0: int) -> ndarray:
+        n, k = p.shape[-1], self.stride
+        rows, cols = slice(i0, n - 1, k), slice(j0, n - 1, k)
+        update = self.updates[(i0, j0)]
+        np.add(
+            p[..., i0 - 1 : n - 2 : k, cols], p[..., i0 + 1 : n : k, cols], out=update
+        )
+        update += p[..., rows, j0 - 1 : n - 2 : k]
+        update += p[..., rows, j0 + 1 : n : k]
+        update -= self.scaled_rhs[..., i0 - 1 :: k, j0 - 1 :: k]
+        update *= 0.25
+        centre = p[..., rows, cols]
+        update -= centre
+        update *= self.relaxation
+        centre += update
+        return np.einsum("...ij,...ij->...", update, update)
+
+    def _residual_norm(self, p: ndarray) -> ndarray:
+        # h^2 * ||rhs - laplace(p)|| over the interior, built like _relax's update
+        n = p.shape[-1]
+        residual = self.scaled_residual
+        np.add(p[..., : n - 2, 1:-1], p[..., 2:, 1:-1], out=residual)
+        residual += p[..., 1:-1, : n - 2]
+        residual += p[..., 1:-1, 2:]
+        residual -= self.scaled_rhs
+        residual *= 0.25
+        residual -= p[..., 1:-1, 1:-1]
+        return 4.0 * np.sqrt(np.einsum("...ij,...ij->...", residual, residual))
+
+    def solve(self, p: ndarray, rhs: ndarray) -> ndarray:
+        scaled_rhs = self.scaled_rhs
+        np.multiply(rhs[..., 1:-1, 1:-1], self.element_length**2, out=scaled_rhs)
+        rhs_norm = np.sqrt(np.einsum("...ij,...ij->...", scaled_rhs, scaled_rhs))
+        apply_pressure_boundary_conditions(p)
+
+        sweep = 0
+        for sweep in range(1, self.max_iterations + 1):
+            squared_update = 0.0
+            for colour in self.colours:
+                for i0, j0 in colour:
+                    squared_update += self._relax(p, i0, j0)
+                apply_pressure_boundary_conditions(p)
+            # Estimate of the scaled residual h^2 * ||r|| from the corrections
+            estimate = 4.0 * np.sqrt(squared_update) / self.relaxation
+            if np.all(estimate <= self.tolerance * rhs_norm):
+                break
+
+        self.iterations = sweep
+        residual = self._residual_norm(p)
+        relative = np.divide(
+            residual,
+            rhs_norm,
+            out=np.array(residual, dtype=float),
+            where=rhs_norm > 0.0,
+        )
+        self.residual = float(np.max(relative))
+        return p
+
+
+class SpectralPoissonSolver:
+    """Direct solver for the discrete pressure Poisson equation.
+
+    Solves the same five-point system that `IterativePoissonSolver`
+    iterates towards, but exactly and in O(N^2 log N). The Neumann side walls
+    make the x direction diagonal in a DCT-II basis. In y the bottom wall is
+    Neumann and the lid is Dirichlet; mirroring the interior rows about the
+    bottom wall turns that into a pure Dirichlet problem of twice the height,
+    which a DST-I diagonalises. The eigenvalues and the mirror buffer are
+    computed once per grid size, and a `batch_shape` solves every member of an
+    ensemble in the same transform calls.
+    """
+
+    iterations = 0  # Direct solve, no sweeps
+
+    def __init__(
+        self, n_points: int, element_length: float, batch_shape: tuple[int, ...] = ()
+    ) -> None:
+        n_interior = n_points - 2
+        k_x = np.arange(n_interior)
+        k_y = np.arange(1, 2 * n_interior + 1)
+        eigenvalues_x = -4.0 * np.sin(np.pi * k_x / (2 * n_interior)) ** 2
+        eigenvalues_y = -4.0 * np.sin(np.pi * k_y / (2 * (2 * n_interior + 1))) ** 2
+        self.n_interior = n_interior
+        self.inverse_eigenvalues = element_length**2 / (
+            eigenvalues_y[:, np.newaxis] + eigenvalues_x[np.newaxis, :]
+        )
+        self.mirrored = np.empty((*batch_shape, 2 * n_interior, n_interior))
+
+    def solve(self, p: ndarray, rhs: ndarray) -> ndarray:
+        m = self.n_interior
+        mirrored = self.mirrored
+        mirrored[..., m:, :] = rhs[..., 1:-1, 1:-1]
+        mirrored[..., :m, :] = rhs[..., -2:0:-1, 1:-1]
+
+        modes = scipy.fft.dct(mirrored, type=2, axis=-1, overwrite_x=True)
+        modes = scipy.fft.dst(modes, type=1, axis=-2, overwrite_x=True)
+        modes *= self.inverse_eigenvalues
+        modes = scipy.fft.idst(modes, type=1, axis=-2, overwrite_x=True)
+        modes = scipy.fft.idct(modes, type=2, axis=-1, overwrite_x=True)
+
+        p[..., 1:-1, 1:-1] = modes[..., m:, :]
+        return apply_pressure_boundary_conditions(p)
+
+
+class DirichletPoissonSolver:
+    """Fast diagonalisation solver for laplace(f) = rhs with f = 0 on every wall.
+
+    Used for the stream function, which is zero along the whole cavity
+    boundary. The five-point operator is diagonal in the DST-I basis in both
+    directions. The sine eigenvectors are applied as a precomputed matrix
+    with `np.matmul` rather than through `scipy.fft`: at the default
+    N_POINTS = 128 the DST length 2 (N - 1) = 254 has the prime factor 127,
+    and the matrix products run several times faster than that FFT while
+    writing only into preallocated buffers. The products broadcast over a
+    leading `batch_shape`, so an ensemble is solved in one call.
+    """
+
+    iterations = 0  # Direct solve, no sweeps
+
+    def __init__(
+        self, n_points: int, element_length: float, batch_shape: tuple[int, ...] = ()
+    ) -> None:
+        n_interior = n_points - 2
+        k = np.arange(1, n_interior + 1)
+        eigenvalues = -4.0 * np.sin(np.pi * k / (2 * (n_interior + 1))) ** 2
+        # sine @ sine = (n_interior + 1) / 2 * I; fold that into the eigenvalues
+        self.sine = np.sin(np.pi * np.outer(k, k) / (n_interior + 1))
+        normalisation = (2.0 / (n_interior + 1)) ** 2
+        self.inverse_eigenvalues = (
+            normalisation
+            * element_length**2
+            / (eigenvalues[:, np.newaxis] + eigenvalues[np.newaxis, :])
+        )
+        self.work = np.empty((*batch_shape, n_interior, n_interior))
+        self.modes = np.empty((*batch_shape, n_interior, n_interior))
+
+    def solve(self, f: ndarray, rhs: ndarray) -> ndarray:
+        sine, work, modes = self.sine, self.work, self.modes
+        np.matmul(sine, rhs[..., 1:-1, 1:-1], out=work)
+        np.matmul(work, sine, out=modes)
+        modes *= self.inverse_eigenvalues
+        np.matmul(sine, modes, out=work)
+        np.matmul(work, sine, out=modes)
+        f[..., 1:-1, 1:-1] = modes
+        f[..., 0, :], f[..., -1, :], f[..., :, 0], f[..., :, -1] = 0.0, 0.0, 0.0, 0.0
+        return f
+
+
+class ADIDiffusionSolver:
+    """Approximately factorised Crank-Nicolson solve for the viscous terms.
+
+    Solves (I - dt nu Dxx / 2)(I - dt nu Dyy / 2) delta = rhs in place on the
+    interior of `rhs`, with delta = 0 on the walls, where Dxx and Dyy are the
+    second differences along x and y. Each factor is tridiagonal along grid
+    lines, so a single `scipy.linalg.solve_banded` call per direction solves
+    every line of the grid at once (one call pair per ensemble member, since
+    the matrix depends on the member's viscosity).
+    """
+
+    def __init__(
+        self, n_points: int, element_length: float, kinematic_viscosity: ndarray
+    ) -> None:
+        self.element_length = element_length
+        self.kinematic_viscosity = kinematic_viscosity
+        self.banded = np.zeros((3, n_points - 2))
+
+    def solve(self, rhs: ndarray, time_step: float) -> ndarray:
+        banded = self.banded
+        for member in np.ndindex(self.kinematic_viscosity.shape[:-2]):
+            nu = float(self.kinematic_viscosity[member + (0, 0)])
+            a = 0.5 * time_step * nu / self.element_length**2
+            banded[0, 1:], banded[1, :], banded[2, :-1] = -a, 1.0 + 2.0 * a, -a
+
+            interior = rhs[member][1:-1, 1:-1]  # rows are y-lines, columns x-lines
+            interior[:] = scipy.linalg.solve_banded(
+                (1, 1), banded, interior.T, check_finite=False
+            ).T
+            interior[:] = scipy.linalg.solve_banded(
+                (1, 1), banded, interior, check_finite=False
+            )
+        return rhs
+
+
+class CavitySolver:
+    """Projection solver for the primitive variables (u, v, p).
+
+    Owns the velocity and pressure fields together with every intermediate
+    array a time step needs, so `step` runs entirely on preallocated
+    workspaces: the derivative buffers are shared between the u and v
+    momentum updates and the tentative velocities, divergence and pressure
+    gradient are written in place.
+
+    Passing sequences for `kinematic_viscosity` and/or `horizontal_velocity`
+    runs an ensemble: every field gains a leading batch axis (B, N, N) and
+    each stencil, Poisson solve and update acts on all B members at once.
+
+    With `time_integration="imex"` advection is extrapolated with second-order
+    Adams-Bashforth and the viscous terms are treated with Crank-Nicolson,
+    factorised into ADI line solves, and the step is limited by the advective
+    CFL number alone. The ADI solve acts on the increment including the old
+    pressure gradient, which vanishes at steady state together with the
+    factorisation error, so steady states are those of the explicit scheme.
+    """
+
+    def __init__(
+        self,
+        n_points: int = N_POINTS,
+        kinematic_viscosity: float | ArrayLike = KINEMATIC_VISCOSITY,
+        horizontal_velocity: float | ArrayLike = HORIZONTAL_VELOCITY,
+        density: float = DENSITY,
+        pressure_solver: str = PRESSURE_SOLVER,
+        time_integration: str = TIME_INTEGRATION,
+    ) -> None:
+        if time_integration not in ("explicit", "imex"):
+            raise ValueError(f"Unknown time integration: {time_integration}")
+        self.n_points = n_points
+        self.element_length = 1.0 / (n_points - 1)
+        self.batch_shape, self.kinematic_viscosity, self.horizontal_velocity = (
+            ensemble_parameters(kinematic_viscosity, horizontal_velocity)
+        )
+        self.density = density
+
+        shape = (*self.batch_shape, n_points, n_points)
+        self.u = np.zeros(shape)
+        self.v = np.zeros(shape)
+        self.p = np.zeros(shape)
+        self.time = 0.0
+        self.time_step = TIME_STEP
+
+        # Workspaces
+        self.u_tent = np.zeros(shape)
+        self.v_tent = np.zeros(shape)
+        self.rhs = np.zeros(shape)
+        self.d_dx = np.zeros(shape)
+        self.d_dy = np.zeros(shape)
+        self.lap = np.zeros(shape)
+
+        if pressure_solver == "spectral":
+            self.poisson_solver = SpectralPoissonSolver(
+                n_points, self.element_length, batch_shape=self.batch_shape
+            )
+        else:
+            self.poisson_solver = IterativePoissonSolver(
+                n_points,
+                self.element_length,
+                method=pressure_solver,
+                batch_shape=self.batch_shape,
+            )
+        self.pressure_iterations = 0
+
+        self.time_integration = time_integration
+        if time_integration == "imex":
+            self.diffusion_solver = ADIDiffusionSolver(
+                n_points, self.element_length, self.kinematic_viscosity
+            )
+            # Advection terms of this and the previous step for Adams-Bashforth
+            self.advection = {"u": np.zeros(shape), "v": np.zeros(shape)}
+            self.previous_advection = {"u": np.zeros(shape), "v": np.zeros(shape)}
+            self.previous_time_step = None
+
+    def _tentative_velocity(self, f: ndarray, time_step: float, out: ndarray) -> None:
+        # out = f + dt * (nu * laplace(f) - u * df/dx - v * df/dy)
+        d_dx = central_difference_x(f, self.element_length, out=self.d_dx)
+        d_dy = central_difference_y(f, self.element_length, out=self.d_dy)
+        lap = laplace(f, self.element_length, out=self.lap)
+        d_dx *= self.u
+        d_dy *= self.v
+        d_dx += d_dy
+        lap *= self.kinematic_viscosity
+        lap -= d_dx
+        lap *= time_step
+        np.add(f, lap, out=out)
+
+    def _imex_tentative_velocity(
+        self,
+        name: str,
+        f: ndarray,
+        pressure_gradient: Callable[..., ndarray],
+        time_step: float,
+        out: ndarray,
+    ) -> None:
+        # (I - dt nu Dxx / 2)(I - dt nu Dyy / 2) delta = dt * (nu * laplace(f)
+        #     - AB2 extrapolation of u df/dx + v df/dy - d(p^n)/d(name) / rho)
+        # out = f + delta + dt * d(p^n)/d(name) / rho
+        advection = self.advection[name]
+        previous = self.previous_advection[name]
+        d_dx = central_difference_x(f, self.element_length, out=self.d_dx)
+        d_dy = central_difference_y(f, self.element_length, out=self.d_dy)
+        np.multiply(self.u, d_dx, out=advection)
+        d_dy *= self.v
+        advection += d_dy
+
+        # Variable-step AB2 weights; the first step falls back to Euler
+        ratio = 0.0
+        if self.previous_time_step is not None:
+            ratio = time_step / self.previous_time_step
+        previous *= -0.5 * ratio
+        np.multiply(advection, 1.0 + 0.5 * ratio, out=out)
+        out += previous
+
+        lap = laplace(f, self.element_length, out=self.lap)
+        lap *= self.kinematic_viscosity
+        lap -= out
+        # rhs is free until the projection rewrites it
+        gradient = pressure_gradient(self.p, self.element_length, out=self.rhs)
+        gradient /= self.density
+        lap -= gradient
+        lap *= time_step
+        self.diffusion_solver.solve(lap, time_step)
+        np.add(f, lap, out=out)
+        # The projection applies the whole pressure gradient again
+        gradient *= time_step
+        out += gradient
+
+        # The extrapolation consumed the old term; keep this step's for the next
+        self.advection[name], self.previous_advection[name] = previous, advection
+
+    def stable_time_step(
+        self,
+        safety_factor: float = SAFETY_FACTOR,
+        min_time_step: float = MIN_TIME_STEP,
+        max_time_step: float = MAX_TIME_STEP,
+    ) -> float:
+        # u_tent/v_tent are fully rewritten by the next step, so reuse them here
+        speed = np.abs(self.u, out=self.u_tent)
+        speed += np.abs(self.v, out=self.v_tent)
+        return stable_time_step(
+            speed.max(axis=(-2, -1)),
+            self.element_length,
+            self.kinematic_viscosity[..., 0, 0],
+            safety_factor,
+            min_time_step,
+            max_time_step,
+            implicit_diffusion=self.time_integration == "imex",
+        )
+
+    def step(self, time_step: float | None = None) -> float:
+        """Advance one time step and return its length.
+
+        Without an explicit `time_step` the step is chosen by
+        `stable_time_step`.
+        """
+        if time_step is None:
+            time_step = self.stable_time_step()
+        h = self.element_length
+        if self.time_integration == "imex":
+            self._imex_tentative_velocity(
+                "u", self.u, central_difference_x, time_step, self.u_tent
+            )
+            self._imex_tentative_velocity(
+                "v", self.v, central_difference_y, time_step, self.v_tent
+            )
+            self.previous_time_step = time_step
+        else:
+            self._tentative_velocity(self.u, time_step, self.u_tent)
+            self._tentative_velocity(self.v, time_step, self.v_tent)
+        apply_boundary_conditions(self.u_tent, self.v_tent, self.horizontal_velocity)
+
+        # Pressure from the divergence of the tentative velocity
+        d_dx = central_difference_x(self.u_tent, h, out=self.d_dx)
+        d_dy = central_difference_y(self.v_tent, h, out=self.d_dy)
+        np.add(d_dx, d_dy, out=self.rhs)
+        self.rhs *= self.density / time_step
+        self.poisson_solver.solve(self.p, self.rhs)
+        self.pressure_iterations = self.poisson_solver.iterations
+
+        # Velocity correction
+        scale = time_step / self.density
+        d_dx = central_difference_x(self.p, h, out=self.d_dx)
+        d_dy = central_difference_y(self.p, h, out=self.d_dy)
+        d_dx *= scale
+        d_dy *= scale
+        np.subtract(self.u_tent, d_dx, out=self.u)
+        np.subtract(self.v_tent, d_dy, out=self.v)
+        apply_boundary_conditions(self.u, self.v, self.horizontal_velocity)
+
+        self.time += time_step
+        self.time_step = time_step
+        return time_step
+
+
+class StreamVorticitySolver:
+    """Stream function-vorticity (psi, omega) solver for the same cavity.
+
+    In 2-D the vorticity transport equation
+
+        d(omega)/dt + u d(omega)/dx + v d(omega)/dy = nu laplace(omega)
+
+    together with laplace(psi) = -omega, u = d(psi)/dy and v = -d(psi)/dx
+    satisfies continuity by construction, so each step needs a single direct
+    Poisson solve for psi and no pressure projection. Wall vorticity follows
+    Thom's formula, omega_wall = -2 psi_adjacent / h^2, with an extra
+    -2 U / h on the moving lid. Exposes `u`, `v`, `time`, `time_step` and
+    `step` like `CavitySolver`, so every engine shares the plotting code, and
+    runs ensembles over sequences of `kinematic_viscosity` and
+    `horizontal_velocity` the same way.
+    """
+
+    pressure_iterations = 0  # No pressure Poisson equation in this formulation
+
+    def __init__(
+        self,
+        n_points: int = N_POINTS,
+        kinematic_viscosity: float | ArrayLike = KINEMATIC_VISCOSITY,
+        horizontal_velocity: float | ArrayLike = HORIZONTAL_VELOCITY,
+    ) -> None:
+        self.n_points = n_points
+        self.element_length = 1.0 / (n_points - 1)
+        self.batch_shape, self.kinematic_viscosity, self.horizontal_velocity = (
+            ensemble_parameters(kinematic_viscosity, horizontal_velocity)
+        )
+
+        shape = (*self.batch_shape, n_points, n_points)
+        self.stream_function = np.zeros(shape)
+        self.vorticity = np.zeros(shape)
+        self.u = np.zeros(shape)
+        self.v = np.zeros(shape)
+        apply_boundary_conditions(self.u, self.v, self.horizontal_velocity)
+        self.time = 0.0
+        self.time_step = TIME_STEP
+
+        # Workspaces
+        self.vorticity_tent = np.zeros(shape)
+        self.rhs = np.zeros(shape)
+        self.d_dx = np.zeros(shape)
+        self.d_dy = np.zeros(shape)
+        self.lap = np.zeros(shape)
+
+        self.poisson_solver = DirichletPoissonSolver(
+            n_points, self.element_length, batch_shape=self.batch_shape
+        )
+
+    def apply_wall_vorticity(self) -> None:
+        psi, omega = self.stream_function, self.vorticity
+        scale = -2.0 / self.element_length**2
+        np.multiply(psi[..., 1, :], scale, out=omega[..., 0, :])
+        np.multiply(psi[..., :, 1], scale, out=omega[..., :, 0])
+        np.multiply(psi[..., :, -2], scale, out=omega[..., :, -1])
+        np.multiply(psi[..., -2, :], scale, out=omega[..., -1, :])
+        omega[..., -1, :] -= 2.0 * self.horizontal_velocity / self.element_length
+
+    def stable_time_step(
+        self,
+        safety_factor: float = SAFETY_FACTOR,
+        min_time_step: float = MIN_TIME_STEP,
+        max_time_step: float = MAX_TIME_STEP,
+    ) -> float:
+        # vorticity_tent is fully rewritten by the next step, so reuse it here
+        speed = np.abs(self.u, out=self.vorticity_tent)
+        speed += np.abs(self.v, out=self.rhs)
+        return stable_time_step(
+            speed.max(axis=(-2, -1)),
+            self.element_length,
+            self.kinematic_viscosity[..., 0, 0],
+            safety_factor,
+            min_time_step,
+            max_time_step,
+        )
+
+    def step(self, time_step: float | None = None) -> float:
+        """Advance one time step and return its length."""
+        if time_step is None:
+            time_step = self.stable_time_step()
+        h = self.element_length
+        omega = self.vorticity
+        self.apply_wall_vorticity()
+
+        # Explicit transport of the interior vorticity
+        d_dx = central_difference_x(omega, h, out=self.d_dx)
+        d_dy = central_difference_y(omega, h, out=self.d_dy)
+        lap = laplace(omega, h, out=self.lap)
+        d_dx *= self.u
+        d_dy *= self.v
+        d_dx += d_dy
+        lap *= self.kinematic_viscosity
+        lap -= d_dx
+        lap *= time_step
+        omega[..., 1:-1, 1:-1] += lap[..., 1:-1, 1:-1]
+
+        # Stream function and the velocities it induces
+        np.negative(omega, out=self.rhs)
+        psi = self.poisson_solver.solve(self.stream_function, self.rhs)
+        central_difference_y(psi, h, out=self.u)
+        central_difference_x(psi, h, out=self.v)
+        self.v *= -1.0
+        apply_boundary_conditions(self.u, self.v, self.horizontal_velocity)
+
+        self.time += time_step
+        self.time_step = time_step
+        return time_step
+
+
+ENGINES = {
+    "primitive": CavitySolver,
+    "primitive-imex": functools.partial(CavitySolver, time_integration="imex"),
+    "vorticity": StreamVorticitySolver,
+}
+
+
+def run_to_steady_state(
+    solver: CavitySolver | StreamVorticitySolver,
+    tolerance: float = STEADY_STATE_TOLERANCE,
+    max_time: float = MAX_STEADY_STATE_TIME,
+    check_interval: int = STEADY_STATE_CHECK_INTERVAL,
+) -> tuple[int, float]:
+    """Step `solver` until max(|du|, |dv|) / dt falls below `tolerance`.
+
+    The rate of change is measured over a single step every
+    `check_interval` steps, using preallocated copies of the velocities.
+    Stops after `max_time` of physical time if the flow has not settled.
+    Returns the number of steps taken and the last measured rate.
+    """
+    u_previous = np.empty_like(solver.u)
+    v_previous = np.empty_like(solver.v)
+    rate = np.inf
+    n_steps = 0
+    while solver.time < max_time:
+        check = (n_steps + 1) % check_interval == 0
+        if check:
+            u_previous[:] = solver.u
+            v_previous[:] = solver.v
+        time_step = solver.step()
+        n_steps += 1
+        if check:
+            u_previous -= solver.u
+            v_previous -= solver.v
+            change = max(np.max(np.abs(u_previous)), np.max(np.abs(v_previous)))
+            rate = change / time_step
+            if rate < tolerance:
+                break
+    return n_steps, rate
+
+
+def centreline_profiles(
+    solver: CavitySolver | StreamVorticitySolver,
+) -> tuple[ndarray, ndarray]:
+    """u along the vertical centreline and v along the horizontal centreline.
+
+    Rows of the fields are y and columns are x; on an even number of points
+    the centreline falls between two grid lines and is averaged from them.
+    """
+    n = solver.n_points
+    lower, upper = (n - 1) // 2, n // 2
+    u_centre = 0.5 * (solver.u[..., :, lower] + solver.u[..., :, upper])
+    v_centre = 0.5 * (solver.v[..., lower, :] + solver.v[..., upper, :])
+    return u_centre, v_centre
+
+
+def compare_engines(
+    n_points: int = N_POINTS, tolerance: float = STEADY_STATE_TOLERANCE
+) -> None:
+    """Run every engine from rest to the same steady state and report their cost.
+
+    Each engine stops once max(|du|, |dv|) / dt falls below `tolerance`, so the
+    wall-clock times are times to steady state. The engines are then compared
+    along the centrelines, away from the lid corners whose singularity each
+    formulation resolves differently.
+    """
+    profiles = {}
+    for name, engine in ENGINES.items():
+        solver = engine(n_points=n_points)
+        start = time.perf_counter()
+        n_steps, rate = run_to_steady_state(solver, tolerance)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:>14}: steady after {n_steps} steps (t = {solver.time:.2f}, "
+            f"max|du/dt| = {rate:.1e}) in {elapsed:.2f} s "
+            f"({1e3 * elapsed / n_steps:.3f} ms/step)"
+        )
+        profiles[name] = centreline_profiles(solver)
+
+    u_reference, v_reference = profiles["primitive"]
+    for name, (u_centre, v_centre) in profiles.items():
+        if name != "primitive":
+            print(
+                f"{name:>14} vs primitive, max centreline difference: "
+                f"u {np.max(np.abs(u_centre - u_reference)):.3e}, "
+                f"v {np.max(np.abs(v_centre - v_reference)):.3e}"
+            )
+
+
+def validate_against_ghia(
+    reynolds_numbers: list[int],
+    n_points: int = N_POINTS,
+    tolerance: float = STEADY_STATE_TOLERANCE,
+) -> None:
+    """Run every engine to steady state and compare with Ghia et al.
+
+    The lid speed and cavity size are 1, so nu = 1 / Re. For each Reynolds
+    number and engine prints the wall-clock time to steady state next to the
+    largest deviation of the centreline velocities from the reference tables.
+    """
+    coordinates = np.linspace(0.0, 1.0, n_points)
+    print(
+        f"{'Re':>5} {'engine':>14} {'steps':>7} {'t_phys':>8} {'wall [s]':>9} "
+        f"{'max|du/dt|':>11} {'u error':>8} {'v error':>8}"
+    )
+    for reynolds_number in reynolds_numbers:
+        for name, engine in ENGINES.items():
+            solver = engine(
+                n_points=n_points, kinematic_viscosity=1.0 / reynolds_number
+            )
+            start = time.perf_counter()
+            n_steps, rate = run_to_steady_state(solver, tolerance)
+            elapsed = time.perf_counter() - start
+
+            u_centre, v_centre = centreline_profiles(solver)
+            u_error = np.max(
+                np.abs(
+                    np.interp(GHIA_Y, coordinates, u_centre) - GHIA_U[reynolds_number]
+                )
+            )
+            v_error = np.max(
+                np.abs(
+                    np.interp(GHIA_X, coordinates, v_centre) - GHIA_V[reynolds_number]
+                )
+            )
+            print(
+                f"{reynolds_number:>5} {name:>14} {n_steps:>7} {solver.time:>8.2f} "
+                f"{elapsed:>9.2f} {rate:>11.2e} {u_error:>8.4f} {v_error:>8.4f}"
+            )
+
+
+def compare_ensemble(
+    reynolds_numbers: list[float],
+    n_points: int = N_POINTS,
+    n_steps: int = ENSEMBLE_BENCHMARK_STEPS,
+    engine: str = ENGINE,
+) -> None:
+    """Time one batched run over several Reynolds numbers against B single runs.
+
+    The ensemble advances with the adaptive step of its most restrictive
+    member; the sequential runs replay the same step sequence, so both do
+    identical work and should agree to round-off.
+    """
+    viscosities = [1.0 / reynolds_number for reynolds_number in reynolds_numbers]
+    ensemble = ENGINES[engine](n_points=n_points, kinematic_viscosity=viscosities)
+    start = time.perf_counter()
+    time_steps = [ensemble.step() for _ in range(n_steps)]
+    ensemble_elapsed = time.perf_counter() - start
+
+    sequential_elapsed = 0.0
+    max_difference = 0.0
+    for member, viscosity in enumerate(viscosities):
+        solver = ENGINES[engine](n_points=n_points, kinematic_viscosity=viscosity)
+        start = time.perf_counter()
+        for time_step in time_steps:
+            solver.step(time_step)
+        sequential_elapsed += time.perf_counter() - start
+        difference = np.max(np.abs(solver.u - ensemble.u[member]))
+        max_difference = max(max_difference, float(difference))
+
+    member_steps = len(viscosities) * n_steps
+    print(
+        f"ensemble of {len(viscosities)}: {ensemble_elapsed:.2f} s "
+        f"({member_steps / ensemble_elapsed:.0f} member-steps/s)"
+    )
+    print(
+        f"sequential:    {sequential_elapsed:.2f} s "
+        f"({member_steps / sequential_elapsed:.0f} member-steps/s)"
+    )
+    print(
+        f"speedup: {sequential_elapsed / ensemble_elapsed:.2f}x, "
+        f"max |u difference|: {max_difference:.1e}"
+    )
+
+
+def colour_limits(field: ndarray) -> tuple[float, float]:
+    low, high = float(np.min(field)), float(np.max(field))
+    return low, max(high, low + EPSILON)
+
+
+def smooth(average: float, value: float, weight: float) -> float:
+    # Exponential moving average
+    return (1.0 - weight) * average + weight * value
+
+
 def main() -> None:
-    element_length = 1.0 / (N_POINTS - 1)
-    x = np.linspace(0.0, 1.0, N_POINTS)
-    y = np.linspace(0.0, 1.0, N_POINTS)
-    X, Y = np.meshgrid(x, y)
+    parser = argparse.ArgumentParser(description="2D lid-driven cavity flow")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default=ENGINE)
+    parser.add_argument(
+        "--compare-engines",
+        action="store_true",
+        help="Time every engine headless to steady state instead of animating",
+    )
+    parser.add_argument(
+        "--validate",
+        type=int,
+        nargs="+",
+        choices=sorted(GHIA_U),
+        metavar="RE",
+        help="Run every engine headless to steady state and compare with Ghia et al.",
+    )
+    parser.add_argument(
+        "--ensemble",
+        type=float,
+        nargs="+",
+        metavar="RE",
+        help="Time one batched run over these Reynolds numbers against sequential runs",
+    )
+    parser.add_argument("--steps", type=int, default=ENSEMBLE_BENCHMARK_STEPS)
+    parser.add_argument("--points", type=int, default=N_POINTS)
+    parser.add_argument(
+        "--steady-tolerance", type=float, default=STEADY_STATE_TOLERANCE
+    )
+    args = parser.parse_args()
+
+    if args.compare_engines:
+        compare_engines(args.points, args.steady_tolerance)
+        return
+    if args.validate:
+        validate_against_ghia(args.validate, args.points, args.steady_tolerance)
+        return
+    if args.ensemble:
+        compare_ensemble(args.ensemble, args.points, args.steps, args.engine)
+        return
 
-    u = np.zeros((N_POINTS, N_POINTS))
-    v = np.zeros((N_POINTS, N_POINTS))
-    p = np.zeros((N_POINTS, N_POINTS))
+    solver = ENGINES[args.engine](n_points=args.points)
+    u, v = solver.u, solver.v
 
-    # Initialize with a small perturbation to help with the flow
-    u[:, :] = 0.1
+    if args.engine != "vorticity":
+        # Initialize with a small perturbation to help with the flow
+        u[:, :] = 0.1
 
     fig, axs = plt.subplots(1, 2, figsize=(12, 6), facecolor="black")
     plt.subplots_adjust(wspace=0.4, hspace=0.4)
@@ -84,14 +974,6 @@ def main() -> None:
     ax_u.set_title("Velocity (u)", color="white")
     ax_v.set_title("Velocity (v)", color="white")
 
-    ax_u.set_xlim(0, 1.0)
-    ax_u.set_ylim(0, 1.0)
-    ax_u.set_aspect("equal")
-
-    ax_v.set_xlim(0, 1.0)
-    ax_v.set_ylim(0, 1.0)
-    ax_v.set_aspect("equal")
-
     # Set axis labels and ticks to white
     for ax in axs:
         ax.tick_params(colors="white")
@@ -102,100 +984,135 @@ def main() -> None:
         ax.spines["left"].set_color("white")
         ax.spines["right"].set_color("white")
 
-    # Initial contour plots
-    contour_u = ax_u.contourf(
-        X, Y, u, cmap="coolwarm", levels=np.linspace(np.min(u), np.max(u) + EPSILON, 20)
+    # Persistent images; each frame only swaps their data and colour limits
+    image_kwargs = dict(
+        origin="lower",
+        extent=(0.0, 1.0, 0.0, 1.0),
+        cmap="coolwarm",
+        interpolation="bilinear",
     )
-    colorbar_u = fig.colorbar(contour_u, ax=ax_u)
-    colorbar_u.ax.yaxis.set_tick_params(color="white")
-    colorbar_u.ax.yaxis.set_tick_params(color="white")
-    colorbar_u.outline.set_edgecolor("white")
-    plt.setp(plt.getp(colorbar_u.ax.axes, "yticklabels"), color="white")
-
-    contour_v = ax_v.contourf(
-        X, Y, v, cmap="coolwarm", levels=np.linspace(np.min(v), np.max(v) + EPSILON, 20)
-    )
-    colorbar_v = fig.colorbar(contour_v, ax=ax_v)
-    colorbar_v.ax.yaxis.set_tick_params(color="white")
-    colorbar_v.outline.set_edgecolor("white")
-    plt.setp(plt.getp(colorbar_v.ax.axes, "yticklabels"), color="white")
-
-    # Text annotation for current iteration
-    iteration_text = fig.suptitle("Iteration: 0", color="white")
-
-    def update(frame: int) -> None:
-        nonlocal u, v, p, contour_u, contour_v, colorbar_u, colorbar_v
-        for _ in range(50):  # Inner loop for more steps per frame
-            d_u_dx = central_difference_x(u, element_length)
-            d_u_dy = central_difference_y(u, element_length)
-            d_v_dx = central_difference_x(v, element_length)
-            d_v_dy = central_difference_y(v, element_length)
-            laplace_u = laplace(u, element_length)
-            laplace_v = laplace(v, element_length)
-
-            # Calculate tentative velocities
-            u_tent = u + TIME_STEP * (
-                -(u * d_u_dx + v * d_u_dy) + KINEMATIC_VISCOSITY * laplace_u
-            )
-            v_tent = v + TIME_STEP * (
-                -(u * d_v_dx + v * d_v_dy) + KINEMATIC_VISCOSITY * laplace_v
-            )
+    image_u = ax_u.imshow(u, **image_kwargs)
+    image_v = ax_v.imshow(v, **image_kwargs)
+    limits = {image_u: colour_limits(u), image_v: colour_limits(v)}
+    shown_limits = dict(limits)
+    for image, (low, high) in limits.items():
+        image.set_clim(low, high)
+        colorbar = fig.colorbar(image, ax=image.axes)
+        colorbar.ax.yaxis.set_tick_params(color="white")
+        colorbar.outline.set_edgecolor("white")
+        plt.setp(plt.getp(colorbar.ax.axes, "yticklabels"), color="white")
 
-            u, v = apply_boundary_conditions(u_tent, v_tent, HORIZONTAL_VELOCITY)
+    # Text annotation for current iteration, inside the Axes so it can be blitted
+    iteration_text = ax_u.text(
+        0.02,
+        0.97,
+        "Iteration: 0",
+        color="white",
+        transform=ax_u.transAxes,
+        va="top",
+        bbox=dict(facecolor="black", alpha=0.5, edgecolor="none"),
+    )
 
-            # Calculate the divergence of the velocity field
-            rhs = (d_u_dx + d_v_dy) / TIME_STEP
-            p = solve_pressure_poisson(p, rhs, element_length)
+    # Sweep statistics are only meaningful for the iterative pressure solvers
+    iterative_pressure = isinstance(
+        getattr(solver, "poisson_solver", None), IterativePoissonSolver
+    )
 
-            d_p_dx = central_difference_x(p, element_length)
-            d_p_dy = central_difference_y(p, element_length)
+    # Wall-clock bookkeeping for frame skipping
+    timing = {"batch": 0.0, "render": 0.0, "last_frame": None, "skip": 1}
 
-            u = u - TIME_STEP / DENSITY * d_p_dx
-            v = v - TIME_STEP / DENSITY * d_p_dy
+    def update(frame: int) -> tuple:
+        frame_start = time.perf_counter()
+        if timing["last_frame"] is not None:
+            # Everything since the previous update returned was drawing
+            render = frame_start - timing["last_frame"]
+            timing["render"] = smooth(timing["render"], render, RENDER_SMOOTHING)
 
-            u, v = apply_boundary_conditions(u, v, HORIZONTAL_VELOCITY)
+        # Simulate `skip` batches per drawn frame so drawing stays in budget
+        pressure_iterations = []
+        for _ in range(timing["skip"]):
+            batch_start = time.perf_counter()
+            for _ in range(STEPS_PER_FRAME):  # Inner loop for more steps per frame
+                if END_TIME is not None and solver.time >= END_TIME:
+                    break
+                solver.step(None if ADAPTIVE_TIME_STEP else TIME_STEP)
+                pressure_iterations.append(solver.pressure_iterations)
+            batch = time.perf_counter() - batch_start
+            timing["batch"] = smooth(timing["batch"], batch, RENDER_SMOOTHING)
 
         # Debug prints to verify intermediate values
-        print(f"Frame: {frame + 1}")
-        print(f"Max u: {np.max(u)}, Max v: {np.max(v)}, Max p: {np.max(p)}")
-
-        # Remove previous contour plots and color bars
-        for c in contour_u.collections:
-            c.remove()
-        for c in contour_v.collections:
-            c.remove()
-        colorbar_u.remove()
-        colorbar_v.remove()
-
-        # Update contour plots
-        contour_u = ax_u.contourf(
-            X,
-            Y,
-            u,
-            cmap="coolwarm",
-            levels=np.linspace(np.min(u), np.max(u) + EPSILON, 20),
+        render_fraction = timing["render"] / (
+            timing["render"] + timing["skip"] * timing["batch"]
         )
-        colorbar_u = fig.colorbar(contour_u, ax=ax_u)
-        colorbar_u.ax.yaxis.set_tick_params(color="white")
-        colorbar_u.outline.set_edgecolor("white")
-        plt.setp(plt.getp(colorbar_u.ax.axes, "yticklabels"), color="white")
-
-        contour_v = ax_v.contourf(
-            X,
-            Y,
-            v,
-            cmap="coolwarm",
-            levels=np.linspace(np.min(v), np.max(v) + EPSILON, 20),
+        print(f"Frame: {frame + 1}, t = {solver.time:.6g}, dt = {solver.time_step:.3g}")
+        if iterative_pressure and pressure_iterations:
+            print(
+                f"Pressure sweeps/step: min {min(pressure_iterations)}, "
+                f"mean {np.mean(pressure_iterations):.1f}, "
+                f"max {max(pressure_iterations)}, "
+                f"residual {solver.poisson_solver.residual:.2e}"
+            )
+        print(
+            f"Max u: {np.max(u)}, Max v: {np.max(v)}, "
+            f"batches/frame: {timing['skip']}, rendering: {100 * render_fraction:.1f}%"
         )
-        colorbar_v = fig.colorbar(contour_v, ax=ax_v)
-        colorbar_v.ax.yaxis.set_tick_params(color="white")
-        colorbar_v.outline.set_edgecolor("white")
-        plt.setp(plt.getp(colorbar_v.ax.axes, "yticklabels"), color="white")
+
+        # Draw every `skip`-th batch, with `skip` chosen so that rendering
+        # takes at most RENDER_BUDGET of the wall-clock time of a frame
+        if timing["batch"] > 0.0:
+            needed = (
+                timing["render"]
+                * (1.0 - RENDER_BUDGET)
+                / (RENDER_BUDGET * timing["batch"])
+            )
+            timing["skip"] = int(min(max(np.ceil(needed), 1), MAX_FRAME_SKIP))
+
+        refresh_colorbars = False
+        for image, field in ((image_u, u), (image_v, v)):
+            image.set_data(field)
+            low, high = limits[image]
+            new_low, new_high = colour_limits(field)
+            low = smooth(low, new_low, COLOUR_LIMIT_SMOOTHING)
+            high = smooth(high, new_high, COLOUR_LIMIT_SMOOTHING)
+            limits[image] = (low, high)
+            image.set_clim(low, high)
+            shown_low, shown_high = shown_limits[image]
+            drift = max(abs(low - shown_low), abs(high - shown_high))
+            if drift > COLORBAR_REFRESH_TOLERANCE * (shown_high - shown_low):
+                refresh_colorbars = True
 
         # Update the iteration text
-        iteration_text.set_text(f"Iteration: {frame + 1}/{N_ITERATIONS}")
+        if END_TIME is None:
+            iteration_text.set_text(f"Iteration: {frame + 1}/{N_ITERATIONS}")
+        else:
+            iteration_text.set_text(f"Time: {solver.time:.4f}/{END_TIME}")
 
-    ani = FuncAnimation(fig, update, frames=range(N_ITERATIONS), repeat=False)
+        if refresh_colorbars:
+            # Colorbars are not blitted; repaint them (and the static
+            # background) once the limits they show are noticeably stale
+            shown_limits.update(limits)
+            fig.canvas.draw()
+
+        timing["last_frame"] = time.perf_counter()
+        return image_u, image_v, iteration_text
+
+    def frames():
+        frame = 0
+        while (END_TIME is None and frame < N_ITERATIONS) or (
+            END_TIME is not None and solver.time < END_TIME
+        ):
+            yield frame
+            frame += 1
+
+    ani = FuncAnimation(
+        fig,
+        update,
+        frames=frames,
+        interval=1,
+        blit=True,
+        repeat=False,
+        cache_frame_data=False,
+    )
     plt.show()
 
 